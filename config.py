@@ -1,6 +1,7 @@
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 
 # Supported image formats and mapping for output extensions
 SUPPORTED_FORMATS: Set[str] = {".jpg", ".jpeg", ".png", ".webp", ".tiff", ".bmp", ".heic", ".heif"}
@@ -11,9 +12,11 @@ EXTENSION_MAP: Dict[str, str] = {
     "HEIF": ".heic",
     "HEIC": ".heic",
 }
+# Input suffixes that share an output extension from EXTENSION_MAP
+SUFFIX_ALIASES: Dict[str, str] = {".jpeg": ".jpg", ".heif": ".heic"}
 
 
-@dataclass
+@dataclass(frozen=True)
 class AppConfig:
     target_file_size_kb: int = 200  # Output target size in KB
     input_folder: str = "in"  # Input folder containing images
@@ -22,12 +25,31 @@ class AppConfig:
     output_naming_mode: str = "folder"  # Output method: 'prefix' or 'folder'
     log_folder: str = "logs"
     log_file: str = "log.txt"
-    webp_method: int = 6  # Default WEBP method (0=fast, 6=best quality)
-    method_tuning_threshold: int = 95  # Only tune method if size is below this % of target
+    webp_method: int = 6  # WEBP method for the final encode (0=fast, 6=best quality)
+    method_tuning_threshold: int = 95  # Accept the predicted quality if size is within this % of target
+    max_workers: int = 0  # Files compressed in parallel (0 = CPU cores + 2 to cover disk waits)
+    profile_cache: str = "profile_cache.json"  # Learned starting qualities in log_folder ("" = off)
+    verbose_log: bool = True  # Write every file's search steps to log_file (off = header and footer only)
+    emit_xlsx: bool = True  # Also convert the CSV report to .xlsx at the end of a run
+    ssim_target: Optional[float] = None  # Lowest SSIM to keep under the size target (needs scikit-image)
+
+    @cached_property
+    def output_format_upper(self) -> str:
+        return self.output_format.upper()
+
+    @cached_property
+    def output_ext(self) -> str:
+        return EXTENSION_MAP.get(self.output_format_upper, ".jpg")
 
     def log_path(self) -> Path:
         return Path(self.log_folder) / self.log_file
 
+    def csv_path(self) -> Path:
+        return Path(self.log_folder) / Path(self.log_file).with_suffix(".csv")
+
     def excel_path(self) -> Path:
         return Path(self.log_folder) / Path(self.log_file).with_suffix(".xlsx")
 
+    def profile_cache_path(self) -> Optional[Path]:
+        return Path(self.log_folder) / self.profile_cache if self.profile_cache else None
+
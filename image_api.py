@@ -1,14 +1,27 @@
+import csv
+import hashlib
 import io
+import json
+import math
 import os
+import shutil
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Dict, Iterable, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from PIL import Image
+from tqdm import tqdm
 
-from config import AppConfig, EXTENSION_MAP, SUPPORTED_FORMATS
+from config import AppConfig, SUFFIX_ALIASES, SUPPORTED_FORMATS
+
+# Optional: the Excel copy of the report (the CSV is always written)
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
 
 # Optional: register HEIC/HEIF support
 try:
@@ -18,18 +31,103 @@ try:
 except ImportError:
     pass
 
+# Optional: libvips for shrink-on-load downscaling
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+# Optional: OpenCV for SIMD area-averaging downscales
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+# Optional: PyTurboJPEG for JPEG search probes without Pillow's save path
+try:
+    import numpy as np
+    from turbojpeg import TJPF_GRAY, TJPF_RGB, TJSAMP_420, TJSAMP_GRAY, TurboJPEG
+
+    _TJ = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _TJ = None
+
+# Optional: pywebp (cffi bindings to libwebp) for WEBP encodes from one imported picture
+try:
+    import webp
+except (ImportError, OSError):
+    webp = None
+
+# Optional: xxhash for faster duplicate detection (falls back to hashlib)
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Optional: scikit-image for the perceptual (SSIM) quality target
+try:
+    import numpy as np
+    from skimage.metrics import structural_similarity
+except ImportError:
+    structural_similarity = None
+
+
+# Pixel modes each lossy encoder accepts without converting
+_NATIVE_MODES: Dict[str, Tuple[str, ...]] = {
+    "JPEG": ("RGB", "L", "CMYK"),
+    "WEBP": ("RGB", "RGBA"),
+    "HEIF": ("RGB", "RGBA"),
+    "HEIC": ("RGB", "RGBA"),
+}
+
+_VIPS_MODES: Dict[int, str] = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+_log = math.log  # bound once for the size-model fits
+
+# str.endswith() takes a tuple and checks every suffix in C
+_SUPPORTED_SUFFIXES = tuple(SUPPORTED_FORMATS)
+
+# WEBP method used by the quality-search probes; only the chosen quality is
+# encoded with the configured (final) method.
+SEARCH_WEBP_METHOD = 0
+
+# Freed 16 MiB blocks of Pillow image memory kept for reuse, per worker, during
+# a run; batches of similarly sized photos then skip most allocations.
+_PIL_BLOCKS_PER_WORKER = 4
+
+# Downscales larger than this factor go through Image.reduce() before LANCZOS.
+REDUCING_GAP = 3.0
+
+REPORT_HEADER = [
+    "Filename",
+    "Original Size (KB)",
+    "Compressed Quality",
+    "Method",
+    "Output Size (KB)",
+    "Size Reduction (%)",
+    "Output Filename",
+    "Processing Time (s)",
+]
 
 LogCallback = Callable[[str], None]
 ProgressCallback = Callable[[int, int], None]
 
 
 class ProcessingController:
-    """Thread-friendly controls for pause/resume/skip/stop."""
+    """Thread-friendly controls for pause/resume/skip/stop.
+
+    Several files are processed at once, so a skip request targets the file
+    that started most recently (the last ``Processing:`` line shown) and is
+    dropped if that file finishes first.
+    """
 
     def __init__(self):
         self._pause = threading.Event()
         self._stop = threading.Event()
-        self._skip = threading.Event()
+        self._lock = threading.Lock()
+        self._current = None  # most recently started file
+        self._skip = None  # file the pending skip request applies to
 
     def pause(self):
         self._pause.set()
@@ -40,8 +138,13 @@ class ProcessingController:
     def stop(self):
         self._stop.set()
 
+    def start(self, item) -> None:
+        with self._lock:
+            self._current = item
+
     def request_skip(self):
-        self._skip.set()
+        with self._lock:
+            self._skip = self._current
 
     def wait_if_paused(self):
         while self._pause.is_set() and not self._stop.is_set():
@@ -50,11 +153,12 @@ class ProcessingController:
     def should_stop(self) -> bool:
         return self._stop.is_set()
 
-    def consume_skip(self) -> bool:
-        if self._skip.is_set():
-            self._skip.clear()
-            return True
-        return False
+    def consume_skip(self, item) -> bool:
+        with self._lock:
+            if self._skip is not None and self._skip == item:
+                self._skip = None
+                return True
+            return False
 
 
 class StopProcessing(Exception):
@@ -71,8 +175,144 @@ def create_folders(config: AppConfig) -> None:
     Path(config.log_folder).mkdir(exist_ok=True)
 
 
-def get_file_size_kb(file_path: Path) -> float:
-    return os.path.getsize(file_path) / 1024
+def _iter_image_files(root: Path, on_error: Optional[LogCallback] = None) -> Iterator[Tuple[Path, int]]:
+    """Yield ``(path, size in bytes)`` for supported image files below ``root``.
+
+    ``os.scandir`` hands back the entry type from the directory listing itself, so
+    unlike ``rglob`` + ``is_file()`` no extra ``stat`` is needed per entry. The
+    size comes from the entry's cached stat (free on Windows, one call elsewhere)
+    and is reused for every later size check. Folders and files that cannot be
+    read are reported to ``on_error`` and skipped, as ``rglob`` did.
+    """
+    stack = [str(root)]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = os.scandir(folder)
+        except OSError as e:
+            if on_error:
+                on_error(f"⚠️ Skipped unreadable folder {folder}: {e.strerror or e}")
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not (entry.name.lower().endswith(_SUPPORTED_SUFFIXES) and entry.is_file()):
+                        continue
+                    size = entry.stat().st_size
+                except OSError as e:
+                    if on_error:
+                        on_error(f"⚠️ Skipped unreadable path {entry.path}: {e.strerror or e}")
+                    continue
+                yield Path(entry.path), size
+
+
+def _file_digest(path: Path) -> str:
+    """Return a content hash of ``path`` for spotting identical inputs."""
+    digest = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _group_duplicates(file_sizes: Dict[Path, int]) -> Dict[Path, List[Path]]:
+    """Map the first of each set of byte-identical files to the others.
+
+    Only files sharing a size are hashed, so a library without duplicates costs
+    nothing beyond the sizes already collected.
+    """
+    by_size: Dict[int, List[Path]] = {}
+    for image_file, size in file_sizes.items():
+        by_size.setdefault(size, []).append(image_file)
+
+    duplicates: Dict[Path, List[Path]] = {}
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        by_digest: Dict[str, List[Path]] = {}
+        for image_file in same_size:
+            by_digest.setdefault(_file_digest(image_file), []).append(image_file)
+        for group in by_digest.values():
+            if len(group) > 1:
+                duplicates[group[0]] = group[1:]
+    return duplicates
+
+
+def _output_file_for(image_file: Path, run: Dict) -> Path:
+    """Return the output path for ``image_file``, creating its folder."""
+    rel_folder = image_file.relative_to(run["input_path"]).parent
+
+    # Prefix mode tags the name with the target size; folder mode files it
+    # under a folder named after the target instead.
+    if run["prefix_naming"]:
+        output_file = run["output_path"] / rel_folder / f"{image_file.stem}{run['prefix_suffix']}"
+    else:
+        output_file = run["size_root"] / rel_folder / f"{image_file.stem}{run['output_ext']}"
+
+    # One mkdir per output folder per run rather than per file. Workers may race
+    # on a new folder; exist_ok makes the loser's mkdir harmless.
+    parent = output_file.parent
+    if parent not in run["created_dirs"]:
+        parent.mkdir(parents=True, exist_ok=True)
+        run["created_dirs"].add(parent)
+    return output_file
+
+
+def _link_duplicate(image_file: Path, source: Dict, run: Dict) -> Dict:
+    """Reuse the output of an identical, already compressed file.
+
+    The output is hard-linked where the filesystem allows it and copied
+    otherwise. ``source`` is the result of the file that was compressed.
+    """
+    output_path = run["output_path"]
+    rel_path = image_file.relative_to(run["input_path"])
+    events = []
+    result = {"events": events, "row": None, "stopped": False, "output_file": None, "profile_sample": None}
+
+    events.append(("start", str(rel_path)))
+    source_row = source["row"]
+    if not source_row:
+        events.append(("line", f"  Skipped: identical to {source['rel_path']}, which was not written"))
+        return result
+
+    try:
+        t0 = time.perf_counter()
+        output_file = _output_file_for(image_file, run)
+        source_file = source["output_file"]
+        if output_file == source_file or (output_file.exists() and os.path.samefile(output_file, source_file)):
+            # Both inputs map to one output (e.g. x.jpg and x.jpeg), already written.
+            shared = True
+        else:
+            # Link or copy under a temporary name and swap it in, so an existing
+            # output is only replaced once the new one is complete.
+            shared = False
+            temp_file = output_file.with_name(f".{output_file.name}.tmp")
+            temp_file.unlink(missing_ok=True)
+            try:
+                try:
+                    os.link(source_file, temp_file)
+                except OSError:
+                    shutil.copyfile(source_file, temp_file)
+                os.replace(temp_file, output_file)
+            except OSError:
+                temp_file.unlink(missing_ok=True)
+                raise
+        t1 = time.perf_counter()
+    except Exception as e:
+        events.append(("line", f"  Error processing {str(rel_path)}: {e}"))
+        return result
+
+    if shared:
+        events.append(("line", f"  Identical to {source['rel_path']} - shares its output file"))
+    else:
+        events.append(("line", f"  Identical to {source['rel_path']} - reused its output"))
+    events.append(("line", f"  Saved as: {output_file.relative_to(output_path)}"))
+    result["output_file"] = output_file
+    result["row"] = [str(rel_path), *source_row[1:6], str(output_file.relative_to(output_path)), f"{t1 - t0:.2f}"]
+    return result
 
 
 def prepare_image(img: Image.Image, output_format: str) -> Image.Image:
@@ -83,16 +323,110 @@ def prepare_image(img: Image.Image, output_format: str) -> Image.Image:
     # If target format does NOT support alpha, flatten image to white background
     if has_alpha and not supports_alpha:
         bg = Image.new("RGB", img.size, (255, 255, 255))  # white background
-        bg.paste(img, mask=img.split()[-1])  # paste using alpha mask
+        # paste() reads the alpha band of an RGBA/LA mask in place, which avoids
+        # split() allocating a copy of every band just to take the last one.
+        bg.paste(img, mask=img if img.mode in ("RGBA", "LA") else img.getchannel("A"))
         return bg
 
     # If image mode is P or LA and format does support alpha, convert to RGBA
     if img.mode in ("P", "LA"):
         return img.convert("RGBA" if supports_alpha else "RGB")
 
+    # Lossy encoders convert any other mode (CMYK, I;16, ...) on every save, which
+    # the quality search would repeat per probe; convert once here instead.
+    native_modes = _NATIVE_MODES.get(output_format.upper())
+    if native_modes and img.mode not in native_modes:
+        return img.convert("RGBA" if has_alpha and supports_alpha else "RGB")
+
     return img
 
 
+def _should_scale(width: int, height: int, scale_settings: Optional[Dict]) -> bool:
+    """Evaluate the scaling mode and the optional width/height conditions."""
+    if not scale_settings or scale_settings.get("mode") == "Off":
+        return False
+    if scale_settings.get("condition") != "On":
+        return True
+
+    cond_w = scale_settings.get("cond_width", 0)
+    cond_h = scale_settings.get("cond_height", 0)
+    cond_logic = scale_settings.get("cond_logic")
+
+    w_cond_active = cond_w > 0
+    h_cond_active = cond_h > 0
+    w_cond_met = width > cond_w
+    h_cond_met = height > cond_h
+
+    if cond_logic == "OR (Any condition met)":
+        return (w_cond_active and w_cond_met) or (h_cond_active and h_cond_met)
+    if cond_logic == "AND (All conditions met)":
+        passes_w = (not w_cond_active) or w_cond_met
+        passes_h = (not h_cond_active) or h_cond_met
+        return passes_w and passes_h and (w_cond_active or h_cond_active)
+    return False
+
+
+def _changes_size(width: int, height: int, scale_settings: Optional[Dict]) -> bool:
+    """Return whether scaling would actually resize a ``width`` x ``height`` image."""
+    if not _should_scale(width, height, scale_settings):
+        return False
+    if scale_settings.get("mode") == "By Target Dimensions":
+        # thumbnail() never enlarges, so an image that already fits is untouched
+        return width > scale_settings.get("width", width) or height > scale_settings.get("height", height)
+    return True
+
+
+def _vips_thumbnail(image_path: Path, size: Tuple[int, int], mode: str) -> Optional[Image.Image]:
+    """Decode and downscale in one pass with libvips, or return None to use Pillow.
+
+    libvips shrinks on load (e.g. JPEG DCT scaling) instead of decoding the full
+    image first. ``mode`` is the vips size mode: "down" keeps the aspect ratio
+    like ``Image.thumbnail``, "force" resizes to exactly ``size``.
+    """
+    if pyvips is None or size[0] <= 0 or size[1] <= 0:
+        return None
+    try:
+        v = pyvips.Image.thumbnail(str(image_path), size[0], height=size[1], size=mode, no_rotate=True)
+        if v.interpretation not in ("srgb", "b-w"):
+            v = v.colourspace("b-w" if v.bands <= 2 else "srgb")
+        if v.format != "uchar":
+            v = v.cast("uchar")
+        pil_mode = _VIPS_MODES.get(v.bands)
+        if pil_mode is None:
+            return None
+        return Image.frombytes(pil_mode, (v.width, v.height), v.write_to_memory())
+    except pyvips.Error:
+        return None
+
+
+def _interpolate_quality(q_low: int, s_low: float, q_high: int, s_high: float, s_target: float) -> Optional[float]:
+    """Solve ln(s) = ln(A) + B*q through two samples for the target size."""
+    if s_high == s_low:
+        return None
+    ln_low = _log(s_low)
+    B = (_log(s_high) - ln_low) / (q_high - q_low)
+    return q_low + (_log(s_target) - ln_low) / B
+
+
+def _cv2_downscale(img: Image.Image, size: Tuple[int, int]) -> Optional[Image.Image]:
+    """Downscale with OpenCV's INTER_AREA, or return None to use Pillow.
+
+    Area averaging is the right filter for shrinking and OpenCV vectorizes it;
+    enlargements and modes other than 8-bit L/RGB/RGBA/CMYK are left to Pillow.
+    RGBA is averaged premultiplied ("RGBa"), as Pillow's resize does, so the
+    colour of fully transparent pixels does not bleed into the edges.
+    """
+    if cv2 is None or img.mode not in ("L", "RGB", "RGBA", "CMYK"):
+        return None
+    if size[0] <= 0 or size[1] <= 0 or size[0] * size[1] >= img.width * img.height:
+        return None
+    mode = "RGBa" if img.mode == "RGBA" else img.mode
+    source = img.convert(mode) if mode != img.mode else img
+    resized = cv2.resize(np.asarray(source), size, interpolation=cv2.INTER_AREA)
+    scaled = Image.frombuffer(mode, size, resized, "raw", mode, 0, 1)
+    return scaled.convert(img.mode) if mode != img.mode else scaled
+
+
 def compress_image(
     image_path: Path,
     config: AppConfig,
@@ -102,10 +436,9 @@ def compress_image(
     initial_quality: int = 95,
     scale_settings: Optional[Dict] = None,
     controller: Optional[ProcessingController] = None,
+    source_fits: bool = False,
 ) -> Tuple[bytes, int, float, int]:
-    import math
-
-    output_format_upper = config.output_format.upper()
+    output_format_upper = config.output_format_upper
     webp_method_default = (
         scale_settings.get("webp_method", config.webp_method) if scale_settings else config.webp_method
     )
@@ -115,238 +448,570 @@ def compress_image(
             controller.wait_if_paused()
             if controller.should_stop():
                 raise StopProcessing()
-            if controller.consume_skip():
+            if controller.consume_skip(image_path):
                 raise SkipProcessing()
 
-    def interpolate_quality(q_low, s_low, q_high, s_high, s_target):
-        if s_high == s_low:
-            return q_low
-        B = (math.log(s_high) - math.log(s_low)) / (q_high - q_low)
-        if B == 0:
-            return q_low
-        ln_A = math.log(s_low) - B * q_low
-        q_target = (math.log(s_target) - ln_A) / B
-        return q_target
-
+    # Open by path rather than from a file object or mmap: Pillow then maps
+    # uncompressed rasters (TIFF, BMP) straight from the page cache on load().
     with Image.open(image_path) as img:
         ensure_running()
         # --- Image Scaling ---
-        if scale_settings and scale_settings.get("mode") != "Off":
-            apply_scale = False
-            if scale_settings.get("condition") != "On":
-                apply_scale = True
-            else:
-                cond_w = scale_settings.get("cond_width", 0)
-                cond_h = scale_settings.get("cond_height", 0)
-                cond_logic = scale_settings.get("cond_logic")
-
-                w_cond_active = cond_w > 0
-                h_cond_active = cond_h > 0
-                w_cond_met = img.width > cond_w
-                h_cond_met = img.height > cond_h
-
-                if cond_logic == "OR (Any condition met)":
-                    if (w_cond_active and w_cond_met) or (h_cond_active and h_cond_met):
-                        apply_scale = True
-                elif cond_logic == "AND (All conditions met)":
-                    passes_w = (not w_cond_active) or w_cond_met
-                    passes_h = (not h_cond_active) or h_cond_met
-                    if passes_w and passes_h and (w_cond_active or h_cond_active):
-                        apply_scale = True
-
-            if apply_scale:
-                if scale_settings.get("mode") == "By Percentage":
-                    percent = scale_settings.get("percent", 100)
-                    new_w = int(img.width * percent / 100)
-                    new_h = int(img.height * percent / 100)
-                    img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                elif scale_settings.get("mode") == "By Target Dimensions":
-                    target_w = scale_settings.get("width", img.width)
-                    target_h = scale_settings.get("height", img.height)
-                    img.thumbnail((target_w, target_h), Image.Resampling.LANCZOS)
-
-        img = prepare_image(img, config.output_format)
-
-        min_quality = 1
-        max_quality = 100
-
-        is_lossless = output_format_upper in ["PNG"]
-        is_heif = output_format_upper in ["HEIF", "HEIC"]
-
-        # For lossless formats, just save once
-        if is_lossless:
-            buffer = io.BytesIO()
-            img.save(buffer, format="PNG", optimize=True, compress_level=9)
-            current_size_kb = len(buffer.getvalue()) / 1024
-            return buffer.getvalue(), 100, current_size_kb, -1
-
-        def get_size_for_quality(quality, method=webp_method_default):
-            buffer = io.BytesIO()
-            save_kwargs = {}
-            if output_format_upper == "WEBP":
-                save_kwargs = {"format": "WEBP", "quality": quality, "method": method}
-            elif is_heif:
-                save_kwargs = {"format": "HEIF", "quality": quality}
-            else:  # JPEG
-                save_kwargs = {"format": "JPEG", "quality": quality, "optimize": True}
-
-            try:
-                img.save(buffer, **save_kwargs)
-            except Exception as e:
-                # Fallback for older Pillow versions that might not support 'method'
-                if "method" in str(e) and output_format_upper == "WEBP":
-                    save_kwargs.pop("method", None)
-                    img.save(buffer, **save_kwargs)
+        if _should_scale(img.width, img.height, scale_settings):
+            if scale_settings.get("mode") == "By Percentage":
+                percent = scale_settings.get("percent", 100)
+                new_w = int(img.width * percent / 100)
+                new_h = int(img.height * percent / 100)
+                scaled = _vips_thumbnail(image_path, (new_w, new_h), "force")
+                if scaled:
+                    img = scaled
+                else:
+                    if img.format == "JPEG":
+                        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale in the DCT stage,
+                        # keeping at least 2x the final size for LANCZOS to work with.
+                        # (Image.thumbnail below already does this on its own.)
+                        img.draft(None, (new_w * 2, new_h * 2))
+                    scaled = _cv2_downscale(img, (new_w, new_h))
+                    if scaled is not None:
+                        img = scaled
+                    else:
+                        # reducing_gap lets Pillow shrink by an integer factor with
+                        # reduce() first and run LANCZOS only over the last <3x.
+                        img = img.resize((new_w, new_h), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+            elif scale_settings.get("mode") == "By Target Dimensions":
+                target_w = scale_settings.get("width", img.width)
+                target_h = scale_settings.get("height", img.height)
+                scaled = _vips_thumbnail(image_path, (target_w, target_h), "down")
+                if scaled:
+                    img = scaled
                 else:
-                    raise RuntimeError(f"Failed saving as {config.output_format}: {e}")
+                    img.thumbnail((target_w, target_h), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+        img = prepare_image(img, output_format_upper)
+        # Finish decoding before the first probe; prepare_image already converted to
+        # the encoder's native mode, so from here on the search is purely encode-bound.
+        # The pixels stay in memory, so the source file is closed before the search.
+        img.load()
+    ensure_running()
+
+    min_quality = 1
+    max_quality = 100
+
+    is_lossless = output_format_upper in ["PNG"]
+    is_heif = output_format_upper in ["HEIF", "HEIC"]
+
+    # For lossless formats, just save once
+    if is_lossless:
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", optimize=True, compress_level=9)
+        data = buffer.getvalue()
+        return data, 100, len(data) / 1024, -1
+
+    encode_buffer = io.BytesIO()
+
+    # The encoder settings depend only on the format and on fast vs. slow, so
+    # they are built once here rather than branched on for every probe.
+    if output_format_upper == "WEBP":
+        fast_kwargs = {"format": "WEBP", "method": SEARCH_WEBP_METHOD}
+        slow_kwargs = {"format": "WEBP", "method": webp_method_default}
+    elif is_heif:
+        fast_kwargs = slow_kwargs = {"format": "HEIF"}
+    else:  # JPEG: 4:2:0 chroma, baseline; metadata is not copied unless passed
+        fast_kwargs = {"format": "JPEG", "optimize": False, "subsampling": 2, "progressive": False}
+        slow_kwargs = {**fast_kwargs, "optimize": True}
+
+    def get_size_for_quality(quality, final=False, method=None):
+        """Encode at ``quality`` and return ``(buffer, size_kb)``.
+
+        Search probes (``final=False``) use the fastest encoder settings; only
+        candidate results are encoded with the slow, size-optimizing ones. ``method``
+        overrides the WEBP method. The size is read from the stream position, so
+        probes that are thrown away never copy their bytes out of the buffer.
+
+        Every encode reuses one buffer, which stays valid until the next call;
+        callers keep ``getvalue()`` copies of the results they need.
+        """
+        slow = final or not fast_probes
+        if turbo_pixels is not None and not slow:
+            data = _TJ.encode(turbo_pixels, quality=quality, **turbo_kwargs)
+            return io.BytesIO(data), len(data) / 1024
+        if webp_picture is not None:
+            if method is None:
+                method = webp_method_default if slow else SEARCH_WEBP_METHOD
+            # buffer() points into the WebPData's memory, which is freed with it:
+            # hold on to the object until the bytes are copied out.
+            webp_data = webp_picture.encode(webp.WebPConfig.new(quality=quality, method=method))
+            data = bytes(webp_data.buffer())
+            return io.BytesIO(data), len(data) / 1024
+
+        buffer = encode_buffer
+        buffer.seek(0)
+        save_kwargs = dict(slow_kwargs if slow else fast_kwargs, quality=quality)
+        if method is not None:
+            save_kwargs["method"] = method
+
+        try:
+            img.save(buffer, **save_kwargs)
+        except Exception as e:
+            # Fallback for older Pillow versions that might not support 'method'
+            if "method" in str(e) and output_format_upper == "WEBP":
+                save_kwargs.pop("method", None)
+                buffer.seek(0)
+                img.save(buffer, **save_kwargs)
+            else:
+                raise RuntimeError(f"Failed saving as {config.output_format}: {e}")
 
-            b = buffer.getvalue()
-            s = len(b) / 1024
-            return b, s
+        # Cut off the tail of a larger previous encode. Truncating here rather
+        # than to 0 before the save keeps the allocation between similar sizes.
+        buffer.truncate()
+        return buffer, buffer.tell() / 1024
 
-        tried = set()
-        history = []  # Store (quality, size, bytes)
+    tuning_threshold = (
+        scale_settings.get("tuning_threshold", config.method_tuning_threshold / 100.0)
+        if scale_settings
+        else config.method_tuning_threshold / 100.0
+    )
 
-        q_initial = max(min_quality, min(max_quality, initial_quality))
-        ensure_running()
-        if log_quality:
-            log_quality(f"Trying quality: {q_initial}")
-        bytes_initial, size_initial = get_size_for_quality(q_initial)
-        if log_size:
-            log_size(f"{size_initial:.2f} KB")
-
-        history.append((q_initial, size_initial, bytes_initial))
-        tried.add(q_initial)
-
-        if size_initial > target_size_kb:
-            q_low = 1
-            if q_low not in tried:
-                ensure_running()
-                if log_quality:
-                    log_quality(f"Trying quality: {q_low}")
-                bytes_low, size_low = get_size_for_quality(q_low)
-                if log_size:
-                    log_size(f"{size_low:.2f} KB")
-                history.append((q_low, size_low, bytes_low))
-                tried.add(q_low)
-                if size_low > target_size_kb:
-                    return bytes_low, q_low, size_low, webp_method_default
+    # Probes skip the slow WEBP methods and JPEG's Huffman optimization pass,
+    # which cost several times the encode but only scale the size curve down:
+    # the final settings come out 5-35% smaller at the same quality, by a ratio
+    # that changes little between nearby qualities. The fast curve therefore
+    # locates the answer and the final-encode step below corrects for the ratio.
+    if output_format_upper == "WEBP":
+        fast_probes = webp_method_default != SEARCH_WEBP_METHOD
+    else:
+        fast_probes = not is_heif  # JPEG optimize pass
+
+    # JPEG probes can go straight to libjpeg-turbo from one cached pixel array;
+    # the final encode stays on Pillow for its Huffman optimization pass.
+    turbo_pixels = None
+    if _TJ is not None and output_format_upper == "JPEG" and img.mode in ("RGB", "L"):
+        turbo_pixels = np.asarray(img)
+        if img.mode == "RGB":
+            turbo_kwargs = {"pixel_format": TJPF_RGB, "jpeg_subsample": TJSAMP_420}
         else:
-            q_high = max_quality
-            if q_high not in tried:
-                ensure_running()
-                if log_quality:
-                    log_quality(f"Trying quality: {q_high}")
-                bytes_high, size_high = get_size_for_quality(q_high)
-                if log_size:
-                    log_size(f"{size_high:.2f} KB")
-                history.append((q_high, size_high, bytes_high))
-                tried.add(q_high)
-                if size_high <= target_size_kb:
-                    return bytes_high, q_high, size_high, webp_method_default
-
-        step = 50.0
-        try_count = len(tried)
-        lower_bound, higher_bound = None, None
-
-        while step >= 1 and try_count <= 10:
-            try_count += 1
-
-            lower_bound, higher_bound = None, None
-            for q, s, b in history:
-                if s <= target_size_kb:
-                    if lower_bound is None or q > lower_bound[0]:
-                        lower_bound = (q, s, b)
-                elif s > target_size_kb:
-                    if higher_bound is None or q < higher_bound[0]:
-                        higher_bound = (q, s, b)
-
-            if lower_bound and higher_bound and (higher_bound[0] - lower_bound[0] <= 1):
-                break
-
-            if lower_bound and higher_bound:
-                q_low, s_low, _ = lower_bound
-                q_high, s_high, _ = higher_bound
-                predicted_quality = interpolate_quality(q_low, s_low, q_high, s_high, target_size_kb)
-                next_quality = max(min_quality, min(max_quality, int(round(predicted_quality))))
-            elif lower_bound:
-                next_quality = min(max_quality, lower_bound[0] + int(step))
-            elif higher_bound:
-                next_quality = max(min_quality, higher_bound[0] - int(step))
-            else:
-                next_quality = (min_quality + max_quality) // 2
-
-            if next_quality in tried:
-                if lower_bound and higher_bound:
-                    next_quality = (lower_bound[0] + higher_bound[0]) // 2
-                else:  # Halve step if stuck
-                    step /= 2
-                    continue
-            if next_quality in tried:  # If still stuck
-                step /= 2
-                continue
-
+            turbo_kwargs = {"pixel_format": TJPF_GRAY, "jpeg_subsample": TJSAMP_GRAY}
+    # With pywebp every WEBP encode, final ones included, reuses one imported
+    # libwebp picture: its RGB(A) to YUV conversion is done by the first encode
+    # and kept, where Pillow imports and converts the pixels again on each save.
+    webp_picture = None
+    if webp is not None and output_format_upper == "WEBP":
+        webp_picture = webp.WebPPicture.from_pil(img)
+    tried: Dict[int, float] = {}  # quality -> size (KB)
+    # Only encodes that can still be returned keep their bytes: the highest
+    # quality under the target, or, until something fits, the smallest result
+    # as a last resort.
+    kept: Dict[str, Tuple[int, float, bytes]] = {}
+
+    def probe(quality):
+        if quality not in tried:
             ensure_running()
             if log_quality:
-                log_quality(f"Trying quality: {next_quality}")
-            current_bytes, current_size_kb = get_size_for_quality(next_quality)
+                log_quality(f"Trying quality: {quality}")
+            buffer, s = get_size_for_quality(quality)
             if log_size:
-                log_size(f"{current_size_kb:.2f} KB")
+                log_size(f"{s:.2f} KB")
+            tried[quality] = s
+            if s <= target_size_kb:
+                if "fit" not in kept or quality > kept["fit"][0]:
+                    kept["fit"] = (quality, s, buffer.getvalue())
+                kept.pop("smallest", None)
+            elif "fit" not in kept and ("smallest" not in kept or s < kept["smallest"][1]):
+                kept["smallest"] = (quality, s, buffer.getvalue())
+        return tried[quality]
+
+    def find_best_quality(target):
+        # File size grows roughly as a*exp(b*q), so two probes are enough to fit
+        # the curve and predict the quality that lands on the target. The second
+        # probe goes where the answer must be: up to 100 if Q85 already fits,
+        # otherwise down to the caller's size-ratio estimate.
+        if source_fits and probe(max_quality) <= target:
+            # The source is already under target but must be re-encoded or scaled,
+            # so the top quality usually fits: one encode settles it.
+            return max_quality
+        q_a, q_b = 85, max_quality
+        if probe(q_a) > target:
+            q_a, q_b = max(5, min(initial_quality, 70)), q_a
+        predicted = _interpolate_quality(q_a, probe(q_a), q_b, probe(q_b), target)
+        if predicted is None:
+            predicted = initial_quality
+        # The seed probes already bound the answer: it is at least the highest
+        # quality that fit and below the lowest one that did not.
+        lo, hi = min_quality, max_quality
+        for q, s in tried.items():
+            if s <= target:
+                if q > lo:
+                    lo = q
+            elif q <= hi:
+                hi = q - 1
+        hi = lo if hi < lo else hi  # nothing fits, or sizes were not monotonic
+        p = int(predicted + 0.5)
+        predicted = lo if p < lo else hi if p > hi else p
+
+        predicted_size = probe(predicted)
+        if predicted_size <= target:
+            lo = predicted
+        else:
+            hi = predicted - 1
+
+        # When the prediction is not close enough, refit the model on the probes
+        # that bracket the target and jump to its new prediction. Output size grows
+        # monotonically with quality, so [lo, hi] always holds the highest quality
+        # that fits; a model step that fails to halve it is followed by a plain
+        # bisection step, which bounds the worst case at bisection's.
+        if not (target * tuning_threshold <= predicted_size <= target):
+            use_model = True
+            while lo < hi:
+                step = None
+                if use_model:
+                    # One pass for the highest fitting and the lowest oversized probe
+                    q_fit = q_over = None
+                    for q, s in tried.items():
+                        if s <= target:
+                            if q_fit is None or q > q_fit:
+                                q_fit = q
+                        elif q_over is None or q < q_over:
+                            q_over = q
+                    if q_fit is not None and q_over is not None:
+                        refit = _interpolate_quality(q_fit, tried[q_fit], q_over, tried[q_over], target)
+                        if refit is not None:
+                            q = int(refit)
+                            step = lo + 1 if q <= lo else hi if q > hi else q
+                quality = step if step is not None else (lo + hi + 1) // 2
+                width = hi - lo
+                size = probe(quality)
+                if size <= target:
+                    lo = quality
+                    if size >= target * tuning_threshold:
+                        break
+                else:
+                    hi = quality - 1
+                use_model = step is None or (hi - lo) * 2 <= width
+        return lo
+
+    # --- Quality Search ---
+    lo = find_best_quality(target_size_kb)
+    if probe(lo) > target_size_kb and fast_probes:
+        # Fast probes can badly overestimate some inputs (e.g. WEBP alpha at
+        # method 0); check the lowest quality with the slow settings and search
+        # again with them only if it fits.
+        fast_probes = False
+        tried.clear()
+        kept.clear()
+        if probe(min_quality) <= target_size_kb:
+            lo = find_best_quality(target_size_kb)
+        else:
+            lo = min_quality
+
+    probe_method = SEARCH_WEBP_METHOD if fast_probes and output_format_upper == "WEBP" else webp_method_default
+    if probe(lo) > target_size_kb:  # Even the lowest quality is too big
+        quality, size, data = kept["smallest"]
+        return data, quality, size, probe_method
 
-            history.append((next_quality, current_size_kb, current_bytes))
-            tried.add(next_quality)
+    best_quality, best_size, best_bytes = kept["fit"]
+    best_method = probe_method
+    size_limited = True  # False once the SSIM target picks a lower quality
+
+    # --- Optional SSIM target ---
+    # SSIM rises with quality, so the size search gives an upper bound and a
+    # second bisection finds the lowest quality below it that still looks right.
+    if config.ssim_target is not None and structural_similarity is not None:
+        reference = np.asarray(img)  # uint8, converted once for every comparison
+        multichannel = reference.ndim == 3
+
+        def ssim_fits(quality):
+            ensure_running()
+            buffer, size = get_size_for_quality(quality)
+            buffer.seek(0)
+            with Image.open(buffer) as decoded:
+                decoded = np.asarray(decoded.convert(img.mode))
+            score = structural_similarity(
+                reference, decoded, data_range=255, channel_axis=-1 if multichannel else None
+            )
+            if log_quality:
+                log_quality(f"SSIM at quality {quality}: {score:.4f}")
+            if score < config.ssim_target:
+                return False
+            kept["ssim"] = (quality, size, buffer.getvalue())
+            return True
 
-            offset_margin = target_size_kb * 0.10
-            if abs(current_size_kb - target_size_kb) < offset_margin:
-                step = 1
+        lo_q, hi_q = min_quality, best_quality
+        while lo_q < hi_q:
+            mid = (lo_q + hi_q) // 2
+            if ssim_fits(mid):
+                hi_q = mid
             else:
-                step = max(1, step / 2)
+                lo_q = mid + 1
+        # Bisection ends on the last passing probe unless best_quality itself was needed
+        if "ssim" in kept and kept["ssim"][0] == lo_q:
+            best_quality, best_size, best_bytes = kept["ssim"]
+            size_limited = False
 
-        # --- Final Selection ---
-        best_under = None
-        for q, s, b in history:
-            if s <= target_size_kb:
-                if best_under is None or s > best_under[1]:
-                    best_under = (q, s, b)
-
-        if best_under is None:  # If all are over, return smallest
-            q, s, b = min(history, key=lambda x: x[1])
-            return b, q, s, webp_method_default
-
-        # --- Method Tuning for WEBP ---
-        best_quality, best_size, best_bytes = best_under
-        best_method = webp_method_default
-        tuning_threshold = (
-            scale_settings.get("tuning_threshold", config.method_tuning_threshold / 100.0)
-            if scale_settings
-            else config.method_tuning_threshold / 100.0
-        )
+    # --- Final encode with the slow settings ---
+    if fast_probes:
 
-        if output_format_upper == "WEBP" and best_size < (target_size_kb * tuning_threshold):
-            for method in range(webp_method_default - 1, -1, -1):
+        def final_encode(quality):
+            ensure_running()
+            if log_quality:
+                if output_format_upper == "WEBP":
+                    log_quality(f"Final encode for Q{quality}: method {webp_method_default}")
+                else:
+                    log_quality(f"Final encode for Q{quality}: optimized")
+            buffer, size = get_size_for_quality(quality, final=True)
+            if log_size:
+                log_size(f"{size:.2f} KB")
+            return buffer, size
+
+        final_buffer, final_size = final_encode(best_quality)
+        if final_size <= target_size_kb:
+            best_bytes, best_size, best_method = final_buffer.getvalue(), final_size, webp_method_default
+            # The slow settings shrink the output by a fairly steady ratio, so the
+            # quality that won on the fast curve often lands under the tuning
+            # threshold once re-encoded. Continue upward: look up the target divided
+            # by the last measured ratio on the (cheap) fast curve and check that
+            # quality with a final encode. [lo_f, hi_f] brackets the answer for the
+            # final settings; a lookup that does not move past lo_f means the next
+            # quality up already misses, so stop there rather than bisecting with
+            # slow encodes, and one beyond hi_f falls back to bisection.
+            lo_f, hi_f = best_quality, max_quality
+            ratio = best_size / probe(best_quality)
+            while size_limited and lo_f < hi_f and best_size < target_size_kb * tuning_threshold:
+                quality = find_best_quality(target_size_kb / ratio)
+                if quality <= lo_f:
+                    break
+                if quality > hi_f:
+                    quality = (lo_f + hi_f + 1) // 2
+                final_buffer, final_size = final_encode(quality)
+                if final_size <= target_size_kb:
+                    lo_f = quality
+                    best_bytes, best_quality, best_size = final_buffer.getvalue(), quality, final_size
+                else:
+                    hi_f = quality - 1
+                ratio = final_size / probe(quality)
+        elif output_format_upper == "WEBP":
+            # The search method fits and the configured one does not: bisect for the
+            # slowest method in between that still fits (at most 3 encodes).
+            lo_m, hi_m = best_method, webp_method_default - 1
+            while lo_m < hi_m:
+                method = (lo_m + hi_m + 1) // 2
                 ensure_running()
                 if log_quality:
                     log_quality(f"Tuning method for Q{best_quality}: {method}")
-                tuned_bytes, tuned_size = get_size_for_quality(best_quality, method=method)
+                tuned_buffer, tuned_size = get_size_for_quality(best_quality, final=True, method=method)
                 if log_size:
                     log_size(f"{tuned_size:.2f} KB")
-
                 if tuned_size <= target_size_kb:
-                    if tuned_size > best_size:  # Found a better size
-                        best_size = tuned_size
-                        best_bytes = tuned_bytes
-                        best_method = method
+                    lo_m = method
+                    best_bytes, best_size, best_method = tuned_buffer.getvalue(), tuned_size, method
                 else:
-                    # This method is too big, so the previous one was the best.
-                    break
+                    hi_m = method - 1
+
+    return best_bytes, best_quality, best_size, best_method
+
+
+def _profile_key(output_format: str, original_size_kb: float, target_kb: float) -> str:
+    """Bucket a file by format and by how many times it must shrink (log2 of the ratio)."""
+    return f"{output_format}:{math.floor(math.log2(original_size_kb / target_kb))}"
+
+
+def _load_profile(path: Optional[Path]) -> Dict[str, List[float]]:
+    """Read the ``{key: [count, mean quality]}`` profile left by earlier runs.
 
-        return best_bytes, best_quality, best_size, best_method
+    A missing, unreadable or malformed file (including one from an older
+    format) is ignored as a whole and the run starts without history.
+    """
+    if path is None:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = {}
+            for key, (n, mean) in json.load(f).items():
+                n, mean = int(n), float(mean)
+                if n < 1 or not 1 <= mean <= 100:
+                    raise ValueError(f"bad profile entry {key!r}")
+                profile[key] = [n, mean]
+            return profile
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def _update_profile(profile: Dict[str, List[float]], key: str, quality: int) -> None:
+    """Fold one chosen quality into the running mean of its bucket."""
+    n, mean = profile.get(key, (0, 0.0))
+    n += 1
+    mean += (quality - mean) / n
+    # Replaced rather than mutated, so workers reading the profile see whole entries
+    profile[key] = [n, mean]
+
+
+def _save_profile(path: Optional[Path], profile: Dict[str, List[float]]) -> None:
+    if path is None or not profile:
+        return
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, sort_keys=True)
+    except OSError:
+        pass  # only a speed-up for the next run
 
 
 def _default_log(message: str) -> None:
     print(message)
 
 
+def _process_one(
+    image_file: Path,
+    config: AppConfig,
+    scale_settings: Optional[Dict],
+    run: Dict,
+    controller: Optional[ProcessingController] = None,
+) -> Dict:
+    """Compress a single file and return its log events and report row.
+
+    Runs on a worker thread, so the log and report are not touched here: log
+    lines are buffered as ``(kind, message)`` events and replayed by the caller.
+    ``run`` holds the per-run constants built once by ``process_images``, plus
+    the set of output folders already created.
+    """
+    input_path = run["input_path"]
+    output_path = run["output_path"]
+    output_ext = run["output_ext"]
+    target_kb = run["target_kb"]
+
+    events = []
+    result = {"events": events, "row": None, "stopped": False, "output_file": None, "profile_sample": None}
+
+    def log_line(message: str) -> None:
+        events.append(("line", message))
+
+    def log_quality(message: str) -> None:
+        events.append(("quality", message))
+
+    def log_size(message: str) -> None:
+        events.append(("size", message))
+
+    # Calculate relative path for output
+    rel_path = image_file.relative_to(input_path)
+    result["rel_path"] = rel_path
+
+    if controller:
+        controller.wait_if_paused()
+        if controller.should_stop():
+            result["stopped"] = True
+            return result
+        controller.start(image_file)
+
+    # Announce the file as it starts rather than when its events are replayed,
+    # so the user can see which file a skip request will apply to.
+    if run["on_start"]:
+        run["on_start"](f"Processing: {str(rel_path)}")
+
+    try:
+        t0 = time.perf_counter()
+        original_size_kb = run["file_sizes"][image_file] / 1024
+
+        if controller and controller.consume_skip(image_file):
+            log_line(f"Skipped by user: {str(rel_path)}")
+            return result
+
+        output_file = _output_file_for(image_file, run)
+
+        # Each report value is formatted once and shared by the log and the row.
+        original_kb = f"{original_size_kb:.2f}"
+        output_name = str(output_file.relative_to(output_path))
+        events.append(("start", str(rel_path)))
+        log_line(f"  Original size: {original_kb} KB")
+
+        # A file already under target, in the output format and not being scaled
+        # meets the spec as-is; anything else still goes through the encoder.
+        source_ext = image_file.suffix.lower()
+        already_done = original_size_kb <= target_kb and SUFFIX_ALIASES.get(source_ext, source_ext) == output_ext
+        if already_done and run["scaling"]:
+            # Conditional or fit-within scaling may leave this file's pixels alone;
+            # Image.open only parses the header, so this costs no decode.
+            with Image.open(image_file) as header:
+                already_done = not _changes_size(header.width, header.height, scale_settings)
+
+        # An output from an earlier run may be a hard link shared with duplicates
+        # (see _link_duplicate). Writing through it would change every linked copy,
+        # so the old file is removed and a new one is written in its place.
+        if already_done:
+            output_file.unlink(missing_ok=True)
+            shutil.copyfile(image_file, output_file)
+            log_line("  No compression needed - copied to output")
+            log_line(f"  Output size: {original_kb} KB")
+            t1 = time.perf_counter()
+            result["row"] = [str(rel_path), original_kb, "-", "-", original_kb, "0.0", output_name, f"{t1 - t0:.2f}"]
+        else:
+            # Start from the mean quality earlier runs chose for files like this one;
+            # without history, fall back to a linear size-ratio estimate.
+            profile_key = None
+            stats = None
+            if run["profile"] is not None:
+                profile_key = _profile_key(run["output_format"], original_size_kb, target_kb)
+                stats = run["profile"].get(profile_key)
+            if stats:
+                initial_quality_guess = int(stats[1] + 0.5)
+            else:
+                guess = int(150 * target_kb / original_size_kb)
+                initial_quality_guess = 1 if guess < 1 else 100 if guess > 100 else guess
+            compressed_bytes, quality, final_size_kb, method = compress_image(
+                image_file,
+                config,
+                target_kb,
+                log_quality=log_quality,
+                log_size=log_size,
+                initial_quality=initial_quality_guess,
+                scale_settings=scale_settings,
+                controller=controller,
+                source_fits=original_size_kb <= target_kb,
+            )
+            output_file.unlink(missing_ok=True)
+            with open(output_file, "wb") as f:
+                f.write(compressed_bytes)
+            method_text = str(method) if method != -1 else "N/A"
+            if profile_key and method != -1 and final_size_kb <= target_kb:
+                result["profile_sample"] = (profile_key, quality)
+            final_kb = f"{final_size_kb:.2f}"
+            reduction = f"{(1 - final_size_kb / original_size_kb) * 100:.1f}"
+            log_line(f"  Compressed with quality: {quality} (method: {method_text})")
+            log_line(f"  Output size: {final_kb} KB")
+            log_line(f"  Size reduction: {reduction}%")
+            t1 = time.perf_counter()
+            result["row"] = [
+                str(rel_path),
+                original_kb,
+                str(quality),
+                method_text,
+                final_kb,
+                reduction,
+                output_name,
+                f"{t1 - t0:.2f}",
+            ]
+
+        log_line(f"  Saved as: {output_name}")
+        result["output_file"] = output_file
+
+    except SkipProcessing:
+        log_line(f"Skipped by user: {str(rel_path)}")
+    except StopProcessing:
+        result["stopped"] = True
+    except Exception as e:
+        log_line(f"  Error processing {str(rel_path)}: {e}")
+
+    return result
+
+
+def _write_excel_report(csv_path: Path, excel_path: Path) -> None:
+    """Convert the CSV report into the Excel workbook in a single streaming pass."""
+    # Write-only mode serializes rows as they are appended instead of keeping a
+    # Cell object per value in memory until the save.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Image Compression Log")
+    with open(csv_path, newline="", encoding="utf-8") as report:
+        for row in csv.reader(report):
+            ws.append(row)
+    wb.save(excel_path)
+
+
 def process_images(
     config: AppConfig,
     scale_settings: Optional[Dict] = None,
@@ -356,9 +1021,6 @@ def process_images(
     on_progress: Optional[ProgressCallback] = None,
     controller: Optional[ProcessingController] = None,
 ) -> Dict[str, int]:
-    from openpyxl import Workbook
-    from tqdm import tqdm
-
     log_fn = on_log or _default_log
     quality_fn = on_quality
     size_fn = on_size
@@ -369,43 +1031,47 @@ def process_images(
     input_path = Path(config.input_folder)
     output_path = Path(config.output_folder)
 
-    # Recursively find all supported image files
-    image_files: Iterable[Path] = [
-        f for f in input_path.rglob("*") if f.suffix.lower() in SUPPORTED_FORMATS and f.is_file()
-    ]
-    image_files = list(image_files)
+    # Recursively find all supported image files, with their sizes. Largest first:
+    # the pool then starts the longest jobs early and finishes on small ones,
+    # instead of a big file starting last and running alone at the end.
+    unreadable: List[str] = []
+    file_sizes = dict(_iter_image_files(input_path, unreadable.append))
+    image_files = sorted(file_sizes, key=file_sizes.__getitem__, reverse=True)
     num_images = len(image_files)
 
     if progress_fn:
         progress_fn(0, num_images)
 
     if not image_files:
+        for message in unreadable:
+            log_fn(message)
         log_fn(f"No supported image files found in '{config.input_folder}' folder.")
         return {"processed": 0, "skipped": 0}
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Image Compression Log"
-    ws.append(
-        [
-            "Filename",
-            "Original Size (KB)",
-            "Compressed Quality",
-            "Method",
-            "Output Size (KB)",
-            "Size Reduction (%)",
-            "Output Filename",
-            "Processing Time (s)",
-        ]
-    )
-
     log_path = config.log_path()
+    csv_path = config.csv_path()
     excel_path = config.excel_path()
+    profile_path = config.profile_cache_path()
+    scaling = bool(scale_settings) and scale_settings.get("mode") != "Off"
+    # Scaled or SSIM-limited runs choose qualities for other reasons, so they
+    # neither read nor extend the profile of plain size-target searches.
+    learning = profile_path is not None and not scaling and config.ssim_target is None
+    profile = _load_profile(profile_path) if learning else None
     quality_buffer = {"last": ""}
 
-    with open(log_path, "w", encoding="utf-8") as log:
+    # Report rows stream to a CSV as files finish; the Excel copy is built from it
+    # in one pass at the end, so no openpyxl work happens per file. Both files are
+    # written from this thread only, with 1 MiB buffers so a batch's short lines
+    # reach the disk in a few large writes.
+    with open(log_path, "w", encoding="utf-8", buffering=1 << 20) as log, open(
+        csv_path, "w", newline="", encoding="utf-8", buffering=1 << 20
+    ) as report:
+        report_writer = csv.writer(report)
+        report_writer.writerow(REPORT_HEADER)
+
         def log_line(message: str) -> None:
-            log.write(message + "\n")
+            log.write(message)
+            log.write("\n")
             log_fn(message)
 
         def log_quality(message: str) -> None:
@@ -421,128 +1087,147 @@ def process_images(
             else:
                 log.write(f"{message}\n")
 
+        def show_size(message: str) -> None:
+            if size_fn:
+                size_fn(message)
+
+        def announce(message: str) -> None:
+            with console_lock:
+                log_fn(message)
+
+        # With UI callbacks, workers announce each file to on_log as it starts (from
+        # their own threads), and its replayed results are headed "Finished:" there
+        # while the log file keeps "Processing:". The lock keeps an announcement out
+        # of the middle of a replay, whose quality and size messages share lines.
+        console_lock = threading.Lock()
+        live = on_log is not None
+        show_start = (lambda rel: log_fn(f"Finished: {rel}")) if live else (lambda rel: log_fn(f"Processing: {rel}"))
+        if config.verbose_log:
+
+            def log_start(rel: str) -> None:
+                log.write(f"Processing: {rel}\n")
+                show_start(rel)
+
+            replay = {"line": log_line, "quality": log_quality, "size": log_size, "start": log_start}
+        else:
+            # Per-file lines only reach the callbacks; the CSV report keeps the results.
+            replay = {
+                "line": log_fn,
+                "quality": quality_fn or (lambda message: None),
+                "size": show_size,
+                "start": show_start,
+            }
+
         log_line("Image Compression Log")
         log_line(f"Date: {datetime.now()}")
         log_line(
-            f"Target Size: {config.target_file_size_kb} KB | Format: {config.output_format.upper()} | Mode: {config.output_naming_mode}"
+            f"Target Size: {config.target_file_size_kb} KB | Format: {config.output_format_upper} | Mode: {config.output_naming_mode}"
         )
+        if config.ssim_target is not None:
+            if structural_similarity is None:
+                log_line("⚠️ scikit-image not installed - ignoring SSIM target")
+            else:
+                log_line(f"SSIM target: {config.ssim_target}")
+        for message in unreadable:
+            log_line(message)
         log_line("-" * 60)
 
-        iterator = image_files
+        # Per-run constants, computed once here instead of once per file
+        run = {
+            "input_path": input_path,
+            "output_path": output_path,
+            "output_ext": config.output_ext,
+            "output_format": config.output_format_upper,
+            "target_kb": config.target_file_size_kb,
+            "prefix_naming": config.output_naming_mode == "prefix",
+            "prefix_suffix": f"_{config.target_file_size_kb}kb{config.output_ext}",
+            "size_root": output_path / str(config.target_file_size_kb),
+            "scaling": scaling,
+            "created_dirs": set(),  # output folders already made this run
+            "file_sizes": file_sizes,  # input sizes in bytes, from the directory walk
+            "profile": profile,  # learned start qualities, updated from this thread only
+            "on_start": announce if live else None,  # called by workers as a file starts
+        }
+
+        # Byte-identical inputs are compressed once; the others reuse that output
+        # when it is written, instead of repeating the same quality search.
+        duplicates = _group_duplicates(file_sizes)
+        skip = {dup for group in duplicates.values() for dup in group}
+
+        # Each file is an independent decode/encode; Pillow releases the GIL inside
+        # its codecs, so a thread pool keeps every core busy while the report and
+        # log file are only ever touched from this thread. Threads rather than
+        # processes also let workers share the controller's pause/stop events and
+        # return encoded bytes without pickling. Workers do their own reads and
+        # writes, so a couple of threads beyond the core count keep every core
+        # encoding while others wait on the disk.
+        workers = config.max_workers or (os.cpu_count() or 1) + 2
+        executor = ThreadPoolExecutor(max_workers=workers)
+        blocks_max = Image.core.get_blocks_max()
+        Image.core.set_blocks_max(max(blocks_max, workers * _PIL_BLOCKS_PER_WORKER))
+        futures = {
+            executor.submit(_process_one, image_file, config, scale_settings, run, controller): image_file
+            for image_file in image_files
+            if image_file not in skip
+        }
+
+        iterator = as_completed(futures)
         if not on_log and not on_progress:
-            # If no UI callbacks, keep CLI progress bar behavior
-            iterator = tqdm(image_files, desc="Compressing Images", unit="file")
-
-        for idx, image_file in enumerate(iterator):
-            if controller:
-                controller.wait_if_paused()
-                if controller.should_stop():
+            # If no UI callbacks, keep CLI progress bar behavior. The bar redraws at
+            # most every 0.1 s and checks the clock only every ~0.2% of the files.
+            iterator = tqdm(
+                iterator,
+                total=len(futures),
+                desc="Compressing Images",
+                unit="file",
+                mininterval=0.1,
+                miniters=max(1, len(futures) // 500),
+            )
+
+        done = 0
+        rows_written = 0
+        last_percent = 0
+        try:
+            for future in iterator:
+                result = future.result()
+                if result["stopped"]:
                     log_line("Stopped by user")
                     break
-            try:
-                t0 = datetime.now().timestamp()
-                original_size_kb = get_file_size_kb(image_file)
-                file_stem = image_file.stem
-                output_ext = EXTENSION_MAP.get(config.output_format.upper(), ".jpg")
-
-                # Calculate relative path for output
-                rel_path = image_file.relative_to(input_path)
-                rel_folder = rel_path.parent
-
-                if controller and controller.consume_skip():
-                    log_line(f"Skipped by user: {str(rel_path)}")
-                    if progress_fn:
-                        progress_fn(idx + 1, num_images)
-                    continue
-
-                if config.output_naming_mode == "prefix":
-                    output_filename = f"{file_stem}_{config.target_file_size_kb}kb{output_ext}"
-                else:
-                    output_filename = f"{file_stem}{output_ext}"
-
-                # Output folder structure
-                if config.output_naming_mode == "prefix":
-                    output_file = output_path / rel_folder / output_filename
-                else:
-                    size_folder = output_path / str(config.target_file_size_kb) / rel_folder
-                    size_folder.mkdir(parents=True, exist_ok=True)
-                    output_file = size_folder / output_filename
-
-                (output_file.parent).mkdir(parents=True, exist_ok=True)
-
-                log_line(f"Processing: {str(rel_path)}")
-                log_line(f"  Original size: {original_size_kb:.2f} KB")
-
-                if original_size_kb <= config.target_file_size_kb:
-                    with open(image_file, "rb") as src, open(output_file, "wb") as dst:
-                        dst.write(src.read())
-                    log_line("  No compression needed - copied to output")
-                    log_line(f"  Output size: {original_size_kb:.2f} KB")
-                    t1 = datetime.now().timestamp()
-                    ws.append(
-                        [
-                            str(rel_path),
-                            f"{original_size_kb:.2f}",
-                            "-",
-                            "-",
-                            f"{original_size_kb:.2f}",
-                            "0.0",
-                            str(output_file.relative_to(output_path)),
-                            f"{t1 - t0:.2f}",
-                        ]
-                    )
-                else:
-                    initial_quality_guess = int(
-                        max(1, min(100, 100 * (config.target_file_size_kb / original_size_kb) * 1.5))
-                    )
-                    compressed_bytes, quality, final_size_kb, method = compress_image(
-                        image_file,
-                        config,
-                        config.target_file_size_kb,
-                        log_quality=log_quality,
-                        log_size=log_size,
-                        initial_quality=initial_quality_guess,
-                        scale_settings=scale_settings,
-                        controller=controller,
-                    )
-                    with open(output_file, "wb") as f:
-                        f.write(compressed_bytes)
-                    reduction = (1 - final_size_kb / original_size_kb) * 100
-                    log_line(f"  Compressed with quality: {quality} (method: {method if method != -1 else 'N/A'})")
-                    log_line(f"  Output size: {final_size_kb:.2f} KB")
-                    log_line(f"  Size reduction: {reduction:.1f}%")
-                    t1 = datetime.now().timestamp()
-                    ws.append(
-                        [
-                            str(rel_path),
-                            f"{original_size_kb:.2f}",
-                            str(quality),
-                            str(method if method != -1 else "N/A"),
-                            f"{final_size_kb:.2f}",
-                            f"{reduction:.1f}",
-                            str(output_file.relative_to(output_path)),
-                            f"{t1 - t0:.2f}",
-                        ]
-                    )
-
-                log_line(f"  Saved as: {output_file.relative_to(output_path)}")
-
-            except SkipProcessing:
-                log_line(f"Skipped by user: {str(rel_path)}")
-                if progress_fn:
-                    progress_fn(idx + 1, num_images)
-                continue
-            except StopProcessing:
-                log_line("Stopped by user")
-                break
-            except Exception as e:
-                log_line(f"  Error processing {str(rel_path)}: {e}")
-
-            if progress_fn:
-                progress_fn(idx + 1, num_images)
-
-    wb.save(excel_path)
-    log_fn(f"✅ Done! Log written to: {log_path} and {excel_path}")
+                if result["profile_sample"]:
+                    _update_profile(profile, *result["profile_sample"])
+                results = [result]
+                results.extend(_link_duplicate(dup, result, run) for dup in duplicates.get(futures[future], ()))
+                for entry in results:
+                    with console_lock:
+                        for kind, message in entry["events"]:
+                            replay[kind](message)
+                    if entry["row"]:
+                        report_writer.writerow(entry["row"])
+                        rows_written += 1
+
+                done += len(results)
+                # Report once per whole percent (and at the end) rather than per file
+                percent = done * 100 // num_images
+                if progress_fn and percent != last_percent:
+                    last_percent = percent
+                    progress_fn(done, num_images)
+            if config.verbose_log:
+                log_line("-" * 60)
+            log_line(f"Finished: {done} of {num_images} files")
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            Image.core.set_blocks_max(blocks_max)
+            if learning:
+                _save_profile(profile_path, profile)
+
+    if config.emit_xlsx and Workbook is None:
+        log_fn(f"✅ Done! Log written to: {log_path} and {csv_path} (install openpyxl for an .xlsx copy)")
+    elif config.emit_xlsx and rows_written:
+        _write_excel_report(csv_path, excel_path)
+        log_fn(f"✅ Done! Log written to: {log_path}, {csv_path} and {excel_path}")
+    else:
+        log_fn(f"✅ Done! Log written to: {log_path} and {csv_path}")
 
     return {"processed": num_images, "skipped": 0}
-
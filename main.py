@@ -1,10 +1,31 @@
+import argparse
+
 from ui import launch_gui
 
 
+def worker_count(value: str) -> int:
+    """argparse type for --workers: a whole number, 0 meaning automatic."""
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got {value!r}")
+    if workers < 0:
+        raise argparse.ArgumentTypeError("must be 0 (automatic) or more")
+    return workers
+
+
 def main():
-    launch_gui()
+    parser = argparse.ArgumentParser(description="Compress images to a target file size.")
+    parser.add_argument(
+        "--workers",
+        type=worker_count,
+        default=0,
+        help="Files compressed in parallel (default: 0 = CPU cores + 2)",
+    )
+    # parse_known_args: bundled app launchers may pass their own arguments
+    args, _ = parser.parse_known_args()
+    launch_gui(max_workers=args.workers)
 
 
 if __name__ == "__main__":
     main()
-
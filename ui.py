@@ -1,11 +1,15 @@
+import queue
 import threading
 import tkinter as tk
-from typing import Optional
+from typing import Dict, Optional
 from tkinter import filedialog, messagebox, ttk
 
 from config import AppConfig
 from image_api import ProcessingController, process_images
 
+# How often the Tk thread drains log lines queued by the worker
+LOG_DRAIN_MS = 100
+
 # Tooltip texts used across the UI
 TOOLTIPS = {
     "TARGET_FILE_SIZE_KB": "Output target size in KB",
@@ -15,8 +19,8 @@ TOOLTIPS = {
     "OUTPUT_NAMING_MODE": "How output files are named and organized.",
     "LOG_FOLDER": "Folder for logs",
     "LOG_FILE": "Log file name",
-    "WEBP_METHOD": "WEBP compression method (0=fastest, 6=best).\nControls the trade-off between encoding speed and file size.",
-    "METHOD_TUNING_THRESHOLD": "Only tune WEBP method if the best found size is below this percentage of the target.\n(e.g., 95 means tuning will only run if size is < 95% of target). Avoids tuning when already very close.",
+    "WEBP_METHOD": "WEBP compression method (0=fastest, 6=best).\nTrial encodes always use the fastest method; this one is used for the final image.",
+    "METHOD_TUNING_THRESHOLD": "Accept the predicted quality without further searching if its size is within this percentage of the target.\n(e.g., 95 means a result between 95% and 100% of the target is accepted). Lower values mean fewer trial encodes.",
     "SCALE_MODE": "Off: No resizing.\nBy Percentage: Scale image by a percentage.\nBy Target Dimensions: Resize to fit within a specific width/height, maintaining aspect ratio.",
     "SCALE_PERCENT": "The percentage to scale the image resolution by (e.g., 50%).",
     "SCALE_WIDTH": "The target width in pixels.",
@@ -25,6 +29,7 @@ TOOLTIPS = {
     "SCALE_COND_WIDTH": "Only scale if image width is greater than this value.",
     "SCALE_COND_HEIGHT": "Only scale if image height is greater than this value.",
     "SCALE_COND_LOGIC": "OR: Scale if any condition is met.\nAND: Scale only if all conditions are met.",
+    "SKIP": "Skip the file in the latest 'Processing:' line.\nSeveral files are processed at once; the others continue, and a file that finishes first is not skipped.",
 }
 
 
@@ -66,8 +71,10 @@ class ToolTip:
             tw.destroy()
 
 
-def launch_gui():
+def launch_gui(max_workers: int = 0):
     controller: Optional[ProcessingController] = None
+    log_queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+    progress_state: Dict[str, int] = {}
     run_bg_default = pause_bg_default = continue_bg_default = skip_bg_default = stop_bg_default = None
 
     def set_running_state(running: bool, paused: bool = False):
@@ -126,11 +133,12 @@ def launch_gui():
                 output_naming_mode=naming_var.get(),
                 webp_method=int(webp_method_var.get()),
                 method_tuning_threshold=int(tuning_threshold_var.get()),
+                max_workers=max_workers,
             )
 
             scale_settings = {
                 "mode": scale_mode_var.get(),
-                "percent": int(scale_percent_var.get()) if scale_percent_var.get() else 0,
+                "percent": scale_percent_var.get(),
                 "width": int(scale_width_var.get()) if scale_width_var.get() else 0,
                 "height": int(scale_height_var.get()) if scale_height_var.get() else 0,
                 "condition": scale_condition_var.get(),
@@ -145,38 +153,51 @@ def launch_gui():
             return
 
         controller = ProcessingController()
+        progress_state.clear()
         log_console.delete("1.0", tk.END)
         total_progress["value"] = 0
         total_progress["maximum"] = 0
         root.update_idletasks()
 
         set_running_state(running=True, paused=False)
-        threading.Thread(target=process_images_gui, args=(cfg, scale_settings, controller), daemon=True).start()
+        done = threading.Event()
+        threading.Thread(target=process_images_gui, args=(cfg, scale_settings, controller, done), daemon=True).start()
+        root.after(LOG_DRAIN_MS, drain_worker_updates, done)
+
+    def drain_worker_updates(done: threading.Event):
+        # The worker only queues text and the latest progress; the Tk thread applies
+        # them in one insert per tick instead of one event-loop round trip per line.
+        finished = done.is_set()
+        chunks = []
+        while True:
+            try:
+                chunks.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if chunks:
+            log_console.insert(tk.END, "".join(chunks))
+            log_console.see(tk.END)
+        if progress_state:
+            total_progress["maximum"] = max(progress_state["total"], 1)
+            total_progress["value"] = progress_state["current"]
+
+        if finished:
+            set_running_state(running=False)
+        else:
+            root.after(LOG_DRAIN_MS, drain_worker_updates, done)
 
-    def process_images_gui(cfg: AppConfig, scale_settings, controller: ProcessingController):
+    def process_images_gui(cfg: AppConfig, scale_settings, controller: ProcessingController, done: threading.Event):
         def log_to_console(message: str):
-            def _append():
-                log_console.insert(tk.END, message + "\n")
-                log_console.see(tk.END)
-            root.after(0, _append)
+            log_queue.put(message + "\n")
 
         def log_quality(message: str):
-            def _append():
-                log_console.insert(tk.END, f"    {message}")
-                log_console.see(tk.END)
-            root.after(0, _append)
+            log_queue.put(f"    {message}")
 
         def log_size(message: str):
-            def _append():
-                log_console.insert(tk.END, f"({message})\n")
-                log_console.see(tk.END)
-            root.after(0, _append)
+            log_queue.put(f"({message})\n")
 
         def update_progress(current: int, total: int):
-            def _update():
-                total_progress["maximum"] = max(total, 1)
-                total_progress["value"] = current
-            root.after(0, _update)
+            progress_state.update(current=current, total=total)
 
         try:
             process_images(
@@ -191,7 +212,7 @@ def launch_gui():
         except Exception as exc:
             root.after(0, lambda: messagebox.showerror("Error", str(exc)))
         finally:
-            root.after(0, lambda: set_running_state(running=False))
+            done.set()
 
     # Build UI
     root = tk.Tk()
@@ -270,8 +291,17 @@ def launch_gui():
     ToolTip(scale_mode_combo, TOOLTIPS["SCALE_MODE"])
 
     tk.Label(scaling_frame, text="Scale by (%):").grid(row=1, column=0, sticky="e", pady=2)
-    scale_percent_var = tk.StringVar(value="50")
-    scale_percent_slider = ttk.Scale(scaling_frame, from_=1, to=100, orient=tk.HORIZONTAL, length=150, variable=scale_percent_var)
+    scale_percent_var = tk.IntVar(value=50)
+    scale_percent_slider = ttk.Scale(
+        scaling_frame,
+        from_=1,
+        to=100,
+        orient=tk.HORIZONTAL,
+        length=150,
+        variable=scale_percent_var,
+        # ttk.Scale moves in fractions; snap to whole percents so the entry shows ints
+        command=lambda value: scale_percent_var.set(round(float(value))),
+    )
     scale_percent_slider.grid(row=1, column=1, sticky="w", pady=2)
     scale_percent_entry = tk.Entry(scaling_frame, textvariable=scale_percent_var, width=5)
     scale_percent_entry.grid(row=1, column=2, sticky="w", padx=5)
@@ -343,6 +373,7 @@ def launch_gui():
 
     skip_btn = tk.Button(controls_frame, text="Skip", command=on_skip, padx=8, pady=5, state="disabled")
     skip_btn.grid(row=0, column=3, padx=5)
+    ToolTip(skip_btn, TOOLTIPS["SKIP"])
 
     stop_btn = tk.Button(controls_frame, text="Stop", command=on_stop, padx=8, pady=5, state="disabled")
     stop_btn.grid(row=0, column=4, padx=5)